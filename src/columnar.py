@@ -0,0 +1,123 @@
+from typing import List, Dict, Tuple
+from datetime import date
+import json
+import os
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from text_processor import to_cents
+
+TRANSACTION_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('amount_cents', pa.int64()),
+    ('description', pa.string()),
+    ('category', pa.dictionary(pa.int32(), pa.string())),
+])
+
+COLUMNAR_EXTENSIONS = {'.parquet', '.arrow', '.feather'}
+
+def to_table(transactions: List[Dict], prefix: str = '') -> pa.Table:
+    """
+    Convert transactions to an Arrow table with typed columns.
+
+    Args:
+        transactions (List[Dict]): Transactions with description and optionally date
+            (YYYY-MM-DD), amount and category; missing values become nulls
+        prefix (str): Prefix added to every column name
+
+    Returns:
+        pa.Table: Table following TRANSACTION_SCHEMA
+    """
+    columns = [
+        # The QIF side of training pairs only has description and category
+        pa.array([date.fromisoformat(t['date']) if t.get('date') else None
+                  for t in transactions], pa.date32()),
+        pa.array([to_cents(t['amount']) if t.get('amount') is not None else None
+                  for t in transactions], pa.int64()),
+        pa.array([t.get('description') for t in transactions], pa.string()),
+        pa.array([t.get('category') for t in transactions], pa.string()).dictionary_encode(),
+    ]
+    names = [prefix + field.name for field in TRANSACTION_SCHEMA]
+    return pa.Table.from_arrays(columns, names=names)
+
+def from_table(table: pa.Table, prefix: str = '') -> List[Dict]:
+    """Convert a table produced by to_table back to the list of dicts used by the other stages."""
+    dates = table.column(prefix + 'date').to_pylist()
+    cents = table.column(prefix + 'amount_cents').to_pylist()
+    descriptions = table.column(prefix + 'description').to_pylist()
+    categories = table.column(prefix + 'category').to_pylist()
+
+    transactions = []
+    for d, c, description, category in zip(dates, cents, descriptions, categories):
+        transaction = {}
+        if d is not None:
+            transaction['date'] = d.isoformat()
+        transaction['description'] = description
+        if c is not None:
+            transaction['amount'] = c / 100
+        if category is not None:
+            transaction['category'] = category
+        transactions.append(transaction)
+    return transactions
+
+def pairs_to_table(pairs: List[Tuple[Dict, Dict]]) -> pa.Table:
+    """Store training pairs side by side, with 'pdf_' and 'qif_' column prefixes."""
+    pdf_table = to_table([p for p, _ in pairs], prefix='pdf_')
+    qif_table = to_table([q for _, q in pairs], prefix='qif_')
+    for name, column in zip(qif_table.column_names, qif_table.columns):
+        pdf_table = pdf_table.append_column(name, column)
+    return pdf_table
+
+def write_table(table: pa.Table, path: str) -> None:
+    """Write a table as Parquet (.parquet) or as an Arrow IPC file (.arrow/.feather)."""
+    if path.endswith('.parquet'):
+        pq.write_table(table, path)
+    else:
+        with pa.OSFile(path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+def read_table(path: str) -> pa.Table:
+    """Read a table; Arrow IPC files are memory-mapped instead of copied."""
+    if path.endswith('.parquet'):
+        return pq.read_table(path, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+def write_qif_table(table: pa.Table, output_path: str) -> None:
+    """
+    Write a transaction table to QIF, formatting whole columns at once.
+
+    Produces the same records as qif_writer.write_qif without building a
+    dict per transaction. Like write_qif, rows without a date or an amount
+    are rejected, since QIF requires both.
+    """
+    for column in ('date', 'amount_cents'):
+        if table.column(column).null_count:
+            raise ValueError(f"Cannot write QIF: {table.column(column).null_count} rows have no {column}")
+    dates = pc.strftime(table.column('date').cast(pa.timestamp('s')), format='%m/%d/%Y').to_pylist()
+    amounts = pc.divide(table.column('amount_cents').cast(pa.float64()), 100.0).to_pylist()
+    descriptions = table.column('description').fill_null('').to_pylist()
+    categories = table.column('category').cast(pa.string()).fill_null('').to_pylist()
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('!Type:Bank\n')
+        for d, amount, description, category in zip(dates, amounts, descriptions, categories):
+            f.write(f'D{d}\nT{amount}\nP{description}\nL{category}\n^\n')
+
+def is_columnar(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in COLUMNAR_EXTENSIONS
+
+def load_transactions(path: str) -> List[Dict]:
+    """Load transactions from a columnar file, or from JSON for any other extension."""
+    if is_columnar(path):
+        return from_table(read_table(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_transactions(transactions: List[Dict], path: str) -> None:
+    """Save transactions to a columnar file, or to JSON for any other extension."""
+    if is_columnar(path):
+        write_table(to_table(transactions), path)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(transactions, f, indent=2, ensure_ascii=False)
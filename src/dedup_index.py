@@ -0,0 +1,131 @@
+from typing import List, Dict, Tuple
+from collections import Counter
+import hashlib
+import sqlite3
+from text_processor import normalize_description, to_cents
+
+def transaction_key(transaction: Dict) -> Tuple[int, int, int]:
+    """
+    Return the (date, amount in cents, description hash) key of a transaction.
+
+    The key must be computed from the row as extracted from the statement,
+    not after mapping, where the description is replaced by the training
+    payee and would change whenever the training data changes.
+
+    The date is stored as a YYYYMMDD integer and the description is hashed
+    after normalize_description, so amounts, dates, reference numbers and
+    punctuation inside the description do not change the key.
+    """
+    date = int(transaction['date'].replace('-', ''))
+    description = normalize_description(transaction.get('description', ''))
+    digest = hashlib.blake2b(description.encode('utf-8'), digest_size=8).digest()
+    return date, to_cents(transaction['amount']), int.from_bytes(digest, 'big', signed=True)
+
+class DedupIndex:
+    """
+    Persistent index of transactions already written to a QIF output.
+
+    Keys live in a SQLite table without rowid whose primary key is the
+    transaction key, so each lookup is a single index probe and nothing is
+    loaded into memory. Each key also stores its occurrence number inside a
+    statement, so two identical purchases on the same day in one statement
+    are both kept, and the source that first claimed it, so processing the
+    same statement again is not reported as a duplicate. Sources should be
+    content hashes rather than paths, so that renaming or moving a statement
+    does not turn all of its transactions into duplicates. When a statement
+    is replaced by a corrected copy, call reassign with the old and new
+    hashes so the new copy keeps the rows it already owned.
+    """
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS seen ('
+            ' date INTEGER NOT NULL,'
+            ' amount_cents INTEGER NOT NULL,'
+            ' desc_hash INTEGER NOT NULL,'
+            ' occurrence INTEGER NOT NULL,'
+            ' source TEXT NOT NULL,'
+            ' PRIMARY KEY (date, amount_cents, desc_hash, occurrence)'
+            ') WITHOUT ROWID'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS seen_source ON seen (source)')
+        self.conn.commit()
+
+    def filter(self, transactions: List[Dict], source: str) -> List[Dict]:
+        """
+        Drop transactions already claimed by another source and record the new ones.
+
+        Args:
+            transactions (List[Dict]): Extracted transactions of a single statement, in order
+            source (str): Identifier of the statement (its content hash)
+
+        Returns:
+            List[Dict]: Transactions that are not duplicates
+        """
+        return [transactions[i] for i in self.keep_indices(transactions, source)]
+
+    def keep_indices(self, transactions: List[Dict], source: str) -> List[int]:
+        """
+        Same as filter, but return the positions of the kept transactions.
+
+        Useful to apply the decision taken on the extracted rows to results
+        derived from them (e.g. mapped or categorized transactions). Claims
+        of this source that are no longer among its transactions are
+        released, so a statement owns exactly the rows it currently has.
+        """
+        occurrences = Counter()
+        kept = []
+        claimed = set()
+        for i, transaction in enumerate(transactions):
+            key = transaction_key(transaction)
+            occurrence = occurrences[key]
+            occurrences[key] += 1
+            row = self.conn.execute(
+                'SELECT source FROM seen WHERE date = ? AND amount_cents = ?'
+                ' AND desc_hash = ? AND occurrence = ?',
+                (*key, occurrence)
+            ).fetchone()
+            if row is None:
+                self.conn.execute(
+                    'INSERT INTO seen VALUES (?, ?, ?, ?, ?)', (*key, occurrence, source)
+                )
+            elif row[0] != source:
+                continue
+            kept.append(i)
+            claimed.add((*key, occurrence))
+        stale = [
+            row for row in self.conn.execute(
+                'SELECT date, amount_cents, desc_hash, occurrence FROM seen WHERE source = ?',
+                (source,)
+            )
+            if tuple(row) not in claimed
+        ]
+        self.conn.executemany(
+            'DELETE FROM seen WHERE date = ? AND amount_cents = ? AND desc_hash = ? AND occurrence = ?',
+            stale
+        )
+        self.conn.commit()
+        if transactions and not kept:
+            print(f"Warning: every transaction of {source} was already exported by another statement")
+        return kept
+
+    def reassign(self, old_source: str, new_source: str) -> None:
+        """Transfer the claims of a superseded statement to the copy that replaces it."""
+        if old_source == new_source:
+            return
+        self.conn.execute('UPDATE seen SET source = ? WHERE source = ?', (new_source, old_source))
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 2:
+        print("Usage: python dedup_index.py <index_db>")
+        sys.exit(1)
+
+    index = DedupIndex(sys.argv[1])
+    count, sources = index.conn.execute('SELECT COUNT(*), COUNT(DISTINCT source) FROM seen').fetchone()
+    print(f"{count} transactions from {sources} statements")
+    index.close()
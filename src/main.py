@@ -1,39 +1,34 @@
 import argparse
 import os
-from training_pairs import extract_all_training_pairs, find_training_pairs
+from typing import List, Dict, Tuple, Optional
+from training_pairs import extract_all_training_pairs, find_training_pairs, match_transactions
+from similarity import ngram_profile, similarity_many
 from pdf_reader import extract_transactions as extract_from_pdf
-from qif_writer import write_qif
+from qif_writer import write_qif, write_qif_records
+from dedup_index import DedupIndex
+from manifest import RunManifest, file_sha256, training_fingerprint
 
-def train_and_process(training_pdf: str, training_qif: str, new_pdf: str, output_qif: str):
+def map_transactions(new_transactions: List[Dict], training_pairs: List[Tuple[Dict, Dict]]) -> List[Dict]:
     """
-    Treina o sistema usando um par PDF-QIF conhecido e processa um novo PDF.
+    Mapeia novas transações para o formato QIF usando o par de treinamento mais similar.
     
     Args:
-        training_pdf: PDF de treinamento com transações conhecidas
-        training_qif: QIF correspondente ao PDF de treinamento
-        new_pdf: Novo PDF para processar
-        output_qif: Onde salvar o QIF gerado
-    """
-    print(f"\nFase 1: Treinamento com {training_pdf} e {training_qif}")
-    # Encontra pares de treinamento
-    training_pairs = find_training_pairs(training_pdf, training_qif)
-    print(f"Encontrados {len(training_pairs)} pares de treinamento")
-    
-    print(f"\nFase 2: Processando novo arquivo {new_pdf}")
-    # Extrai transações do novo PDF
-    new_transactions = extract_from_pdf(new_pdf)
-    print(f"Encontradas {len(new_transactions)} transações no novo PDF")
+        new_transactions: Transações extraídas do novo PDF
+        training_pairs: Pares (transação_pdf, transação_qif) de treinamento
     
-    print("\nFase 3: Mapeando transações para formato QIF")
-    # Para cada nova transação, encontra o par de treinamento mais similar
+    Returns:
+        Transações com os campos do QIF de treinamento (ou originais, sem match)
+    """
     mapped_transactions = []
+    # Perfis das descrições de treinamento calculados uma única vez
+    train_profiles = [ngram_profile(pdf_train.get('description', '')) for pdf_train, _ in training_pairs]
     for trans in new_transactions:
         best_match = None
         best_score = 0.7  # threshold mínimo para considerar um match
+        desc_scores = similarity_many(trans.get('description', ''), train_profiles)
         
-        for pdf_train, qif_train in training_pairs:
-            from training_pairs import match_transactions
-            score = match_transactions(trans, pdf_train)
+        for (pdf_train, qif_train), desc_score in zip(training_pairs, desc_scores):
+            score = match_transactions(trans, pdf_train, desc_score)
             if score > best_score:
                 best_score = score
                 best_match = qif_train
@@ -48,20 +43,64 @@ def train_and_process(training_pdf: str, training_qif: str, new_pdf: str, output
             # Se não encontrou match, usa a transação original sem categoria
             mapped_transactions.append(trans)
     
+    return mapped_transactions
+
+def train_and_process(training_pdf: str, training_qif: str, new_pdf: str, output_qif: str,
+                      dedup_index: Optional[DedupIndex] = None):
+    """
+    Treina o sistema usando um par PDF-QIF conhecido e processa um novo PDF.
+    
+    Args:
+        training_pdf: PDF de treinamento com transações conhecidas
+        training_qif: QIF correspondente ao PDF de treinamento
+        new_pdf: Novo PDF para processar
+        output_qif: Onde salvar o QIF gerado
+        dedup_index: Índice persistente para descartar transações já exportadas
+    """
+    print(f"\nFase 1: Treinamento com {training_pdf} e {training_qif}")
+    # Encontra pares de treinamento
+    training_pairs = find_training_pairs(training_pdf, training_qif)
+    print(f"Encontrados {len(training_pairs)} pares de treinamento")
+    
+    print(f"\nFase 2: Processando novo arquivo {new_pdf}")
+    # Extrai transações do novo PDF
+    new_transactions = extract_from_pdf(new_pdf)
+    print(f"Encontradas {len(new_transactions)} transações no novo PDF")
+    
+    print("\nFase 3: Mapeando transações para formato QIF")
+    # Para cada nova transação, encontra o par de treinamento mais similar
+    mapped_transactions = map_transactions(new_transactions, training_pairs)
+    
+    if dedup_index is not None:
+        # A chave vem da transação extraída (o mapeamento troca a descrição) e a
+        # origem é o hash do conteúdo, para sobreviver a renomeações do PDF
+        keep = dedup_index.keep_indices(new_transactions, source=file_sha256(new_pdf))
+        print(f"Descartadas {len(mapped_transactions) - len(keep)} transações duplicadas")
+        mapped_transactions = [mapped_transactions[i] for i in keep]
+    
     print("\nFase 4: Gerando arquivo QIF")
     write_qif(mapped_transactions, output_qif)
     print(f"QIF gerado em {output_qif}")
     
     return mapped_transactions
 
-def process_multiple_files(input_list: str, training_pdf: str, training_qif: str):
+def process_multiple_files(input_list: str, training_pdf: str, training_qif: str,
+                           dedup_index: Optional[DedupIndex] = None, rebuild: bool = False):
     """
     Processa múltiplos PDFs usando um único par de treinamento.
     
+    O resultado de cada PDF fica em cache e um manifesto (<saída>.manifest.json)
+    registra o hash do PDF e dos arquivos de treinamento de que ele depende.
+    Numa nova execução só são reprocessados os PDFs novos ou alterados (ou
+    todos, se o treinamento mudou), e o QIF final é remontado a partir do cache.
+    
     Args:
         input_list: Arquivo com lista de PDFs e QIF de saída
         training_pdf: PDF de treinamento
         training_qif: QIF de treinamento
+        dedup_index: Índice persistente para descartar transações repetidas
+            entre extratos sobrepostos
+        rebuild: Ignora o cache e reprocessa todos os PDFs
     """
     # Lê a lista de arquivos
     with open(input_list, 'r') as f:
@@ -73,21 +112,52 @@ def process_multiple_files(input_list: str, training_pdf: str, training_qif: str
     input_pdfs = files[:-1]  # Todos exceto o último são PDFs de entrada
     output_qif = files[-1]   # Último arquivo é o QIF de saída
     
-    # Processa cada PDF e combina os resultados
-    all_transactions = []
+    manifest = RunManifest(output_qif, training_fingerprint([training_pdf, training_qif]))
+    
+    # Obtém o resultado de cada PDF, do cache ou reprocessando
+    results = []
+    training_pairs = None
     for pdf_file in input_pdfs:
-        print(f"\nProcessando {pdf_file}...")
-        transactions = train_and_process(
-            training_pdf=training_pdf,
-            training_qif=training_qif,
-            new_pdf=pdf_file,
-            output_qif=output_qif
-        )
-        all_transactions.extend(transactions)
-    
-    # Gera QIF final com todas as transações
-    print(f"\nGerando QIF final com {len(all_transactions)} transações...")
-    write_qif(all_transactions, output_qif)
+        sha256 = file_sha256(pdf_file)
+        cached = None if rebuild else manifest.load_cached(pdf_file, sha256)
+        if cached is not None:
+            new_transactions, transactions = cached
+            print(f"\n{pdf_file}: sem alterações, usando {len(transactions)} transações do cache")
+        else:
+            # Os pares de treinamento só são calculados se algum PDF precisar ser processado
+            if training_pairs is None:
+                print(f"\nTreinamento com {training_pdf} e {training_qif}")
+                training_pairs = find_training_pairs(training_pdf, training_qif)
+                print(f"Encontrados {len(training_pairs)} pares de treinamento")
+            print(f"\nProcessando {pdf_file}...")
+            new_transactions = extract_from_pdf(pdf_file)
+            print(f"Encontradas {len(new_transactions)} transações no novo PDF")
+            transactions = map_transactions(new_transactions, training_pairs)
+            manifest.store(sha256, new_transactions, transactions)
+        
+        if dedup_index is not None:
+            # Chave calculada sobre as transações extraídas, origem = hash do conteúdo
+            previous = manifest.previous.get(pdf_file)
+            if previous is not None and previous['sha256'] != sha256:
+                # PDF corrigido no mesmo caminho: herda as transações da versão anterior
+                dedup_index.reassign(previous['sha256'], sha256)
+            keep = dedup_index.keep_indices(new_transactions, source=sha256)
+            print(f"Descartadas {len(transactions) - len(keep)} transações duplicadas")
+            transactions = [transactions[i] for i in keep]
+        results.append((pdf_file, sha256, transactions))
+    
+    # Remonta o QIF final com todas as transações, registrando a posição de cada PDF
+    total = sum(len(transactions) for _, _, transactions in results)
+    print(f"\nGerando QIF final com {total} transações...")
+    first = 0
+    with open(output_qif, 'w', encoding='utf-8') as f:
+        f.write('!Type:Bank\n')
+        for pdf_file, sha256, transactions in results:
+            byte_start = f.tell()
+            write_qif_records(f, transactions)
+            manifest.record(pdf_file, sha256, first, len(transactions), byte_start, f.tell())
+            first += len(transactions)
+    manifest.save()
     print(f"QIF final gerado em {output_qif}")
 
 def main():
@@ -110,15 +180,30 @@ def main():
     # Argumento opcional para saída (necessário apenas com --pdf)
     parser.add_argument('--output', help='Arquivo QIF de saída (necessário com --pdf)')
     
+    # Reprocessa todos os PDFs da lista, ignorando o cache da execução anterior
+    parser.add_argument('--rebuild', action='store_true',
+                      help='Ignora o cache e reprocessa todos os PDFs (com --input-list)')
+    
+    # Índice persistente de transações já exportadas (extratos sobrepostos)
+    parser.add_argument('--dedup-index',
+                      help='Base SQLite com as transações já exportadas, para descartar duplicadas')
+    
     args = parser.parse_args()
     
     if args.pdf and not args.output:
         parser.error("--output é necessário quando usando --pdf")
     
-    if args.input_list:
-        process_multiple_files(args.input_list, args.train_pdf, args.train_qif)
-    else:
-        train_and_process(args.train_pdf, args.train_qif, args.pdf, args.output)
+    dedup_index = DedupIndex(args.dedup_index) if args.dedup_index else None
+    
+    try:
+        if args.input_list:
+            process_multiple_files(args.input_list, args.train_pdf, args.train_qif, dedup_index,
+                                   rebuild=args.rebuild)
+        else:
+            train_and_process(args.train_pdf, args.train_qif, args.pdf, args.output, dedup_index)
+    finally:
+        if dedup_index is not None:
+            dedup_index.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
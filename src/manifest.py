@@ -0,0 +1,96 @@
+from typing import List, Dict, Optional, Tuple
+import hashlib
+import json
+import os
+
+# Incrementar quando a extração ou o mapeamento mudarem de forma que
+# resultados já guardados em cache deixem de ser válidos
+PIPELINE_VERSION = 2
+
+def file_sha256(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def training_fingerprint(training_files: List[str]) -> str:
+    """Hash of the training files and the pipeline version that per-file results depend on."""
+    digest = hashlib.sha256(f"v{PIPELINE_VERSION}".encode())
+    for path in training_files:
+        digest.update(file_sha256(path).encode())
+    return digest.hexdigest()
+
+class RunManifest:
+    """
+    Records, for each input of a run, what its cached result was computed from.
+
+    The manifest lives next to the output QIF (<output>.manifest.json) and the
+    per-file results in <output>.cache/. An input is reused on the next run
+    only if its content hash, the training fingerprint and the pipeline
+    version are all unchanged.
+    """
+    def __init__(self, output_qif: str, fingerprint: str):
+        self.path = output_qif + '.manifest.json'
+        self.cache_dir = output_qif + '.cache'
+        self.fingerprint = fingerprint
+        self.previous: Dict[str, Dict] = {}
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.previous = json.load(f).get('inputs', {})
+
+    def _cache_path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, f"{sha256}.json")
+
+    def load_cached(self, input_path: str, sha256: str) -> Optional[Tuple[List[Dict], List[Dict]]]:
+        """
+        Return the cached (extracted, mapped) transactions of an input, or None
+        if it must be recomputed.
+        """
+        entry = self.previous.get(input_path)
+        if (entry is None or entry['sha256'] != sha256
+                or entry['fingerprint'] != self.fingerprint
+                or entry['pipeline_version'] != PIPELINE_VERSION):
+            return None
+        cache_path = self._cache_path(sha256)
+        if not os.path.exists(cache_path):
+            return None
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        return cached['extracted'], cached['mapped']
+
+    def store(self, sha256: str, extracted: List[Dict], mapped: List[Dict]) -> None:
+        """
+        Save the result of an input to the cache.
+
+        The extracted rows are kept alongside the mapped ones because the
+        dedup key is computed from the statement, not from the mapped payee.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._cache_path(sha256), 'w', encoding='utf-8') as f:
+            json.dump({'extracted': extracted, 'mapped': mapped}, f, ensure_ascii=False)
+
+    def record(self, input_path: str, sha256: str, first: int, count: int,
+               byte_start: int, byte_end: int) -> None:
+        """Register an input of the current run and where its transactions ended up in the output."""
+        self.entries[input_path] = {
+            'sha256': sha256,
+            'fingerprint': self.fingerprint,
+            'pipeline_version': PIPELINE_VERSION,
+            'first_transaction': first,
+            'transactions': count,
+            'byte_start': byte_start,
+            'byte_end': byte_end,
+        }
+
+    def save(self) -> None:
+        """Write the manifest and remove cached results no longer used by any input."""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'inputs': self.entries}, f, indent=2)
+        if os.path.isdir(self.cache_dir):
+            used = {f"{e['sha256']}.json" for e in self.entries.values()}
+            for name in os.listdir(self.cache_dir):
+                if name not in used:
+                    os.remove(os.path.join(self.cache_dir, name))
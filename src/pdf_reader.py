@@ -52,10 +52,15 @@ def extract_transactions(pdf_path: str) -> List[Dict]:
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 2:
-        print("Usage: python pdf_reader.py <pdf_path>")
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python pdf_reader.py <pdf_path> [output.json|.parquet|.arrow]")
         sys.exit(1)
         
     transactions = extract_transactions(sys.argv[1])
+    if len(sys.argv) == 3:
+        from columnar import save_transactions
+        save_transactions(transactions, sys.argv[2])
+        print(f"{len(transactions)} transactions written to {sys.argv[2]}")
+        sys.exit(0)
     for transaction in transactions:
         print(transaction) 
\ No newline at end of file
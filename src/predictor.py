@@ -1,6 +1,14 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import json
+import os
 from trainer import TransactionCategorizer
 
+# Model loaded once per pool process (see categorize_jsonl)
+_worker_categorizer: Optional[TransactionCategorizer] = None
+
 def categorize_transactions(transactions: List[Dict], model_path: str) -> List[Dict]:
     """
     Categorize transactions using the trained model.
@@ -15,6 +23,22 @@ def categorize_transactions(transactions: List[Dict], model_path: str) -> List[D
     # Load the model
     categorizer = TransactionCategorizer.load_model(model_path)
     
+    return apply_categories(transactions, categorizer)
+
+def apply_categories(transactions: List[Dict], categorizer: TransactionCategorizer) -> List[Dict]:
+    """
+    Categorize transactions using an already loaded model.
+    
+    Args:
+        transactions (List[Dict]): List of transactions with 'description' field
+        categorizer (TransactionCategorizer): Trained categorizer kept in memory
+        
+    Returns:
+        List[Dict]: Transactions with added 'category' field
+    """
+    if not transactions:
+        return []
+    
     # Predict categories
     categories = categorizer.predict(transactions)
     
@@ -27,24 +51,106 @@ def categorize_transactions(transactions: List[Dict], model_path: str) -> List[D
     
     return categorized_transactions
 
+def _init_worker(model_path: str) -> None:
+    global _worker_categorizer
+    _worker_categorizer = TransactionCategorizer.load_model(model_path, mmap_mode='r')
+
+def _categorize_chunk(chunk: List[Dict]) -> List[Dict]:
+    return apply_categories(chunk, _worker_categorizer)
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[Dict]:
+    """Yield one transaction per non-empty JSON Lines record."""
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+def iter_chunks(items: Iterable[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+    """Split an iterable into lists of at most chunk_size items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def write_jsonl(transactions: List[Dict], f) -> int:
+    """Append transactions to an open JSON Lines file and return how many were written."""
+    for transaction in transactions:
+        f.write(json.dumps(transaction, ensure_ascii=False) + '\n')
+    return len(transactions)
+
+def categorize_jsonl(input_path: str, output_path: str, model_path: str,
+                     chunk_size: int = 10000, workers: Optional[int] = None) -> int:
+    """
+    Categorize a JSON Lines file of transactions on a pool of processes.
+    
+    The input is streamed in chunks of chunk_size transactions; at most two
+    chunks per worker are in flight, so memory stays bounded whatever the
+    input size. Each worker memory-maps the same model file and results are
+    written in input order.
+    
+    Args:
+        input_path (str): JSON Lines file with one transaction per line
+        output_path (str): JSON Lines file to write the categorized transactions
+        model_path (str): Path to the trained model file
+        chunk_size (int): Number of transactions sent to a worker at once
+        workers (int): Number of processes (defaults to the number of CPUs)
+        
+    Returns:
+        int: Number of transactions written
+    """
+    workers = workers or os.cpu_count() or 1
+    written = 0
+    
+    with open(input_path, 'r', encoding='utf-8') as fin, \
+            open(output_path, 'w', encoding='utf-8') as fout, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(model_path,)) as executor:
+        pending = deque()
+        for chunk in iter_chunks(read_jsonl(fin), chunk_size):
+            pending.append(executor.submit(_categorize_chunk, chunk))
+            # Wait for the oldest chunk to keep input order and bound memory
+            if len(pending) >= 2 * workers:
+                written += write_jsonl(pending.popleft().result(), fout)
+        while pending:
+            written += write_jsonl(pending.popleft().result(), fout)
+    
+    return written
+
 if __name__ == "__main__":
     import sys
-    import json
     
-    if len(sys.argv) != 3:
-        print("Usage: python predictor.py <model_path> <transactions_json>")
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        if len(sys.argv) not in (5, 6, 7):
+            print("Usage: python predictor.py --batch <model_path> <input_jsonl> <output_jsonl> [chunk_size] [workers]")
+            sys.exit(1)
+        chunk_size = int(sys.argv[5]) if len(sys.argv) > 5 else 10000
+        workers = int(sys.argv[6]) if len(sys.argv) > 6 else None
+        count = categorize_jsonl(sys.argv[3], sys.argv[4], sys.argv[2], chunk_size, workers)
+        print(f"{count} categorized transactions written to {sys.argv[4]}")
+        sys.exit(0)
+    
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python predictor.py <model_path> <transactions_json|parquet|arrow> [output]")
+        print("       python predictor.py --batch <model_path> <input_jsonl> <output_jsonl> [chunk_size] [workers]")
         sys.exit(1)
     
+    from columnar import load_transactions, save_transactions
+    
     model_path = sys.argv[1]
     transactions_file = sys.argv[2]
     
-    # Load transactions from JSON file
-    with open(transactions_file, 'r', encoding='utf-8') as f:
-        transactions = json.load(f)
+    # Load transactions from a JSON or columnar file
+    transactions = load_transactions(transactions_file)
     
     # Categorize transactions
     categorized = categorize_transactions(transactions, model_path)
     
+    if len(sys.argv) == 4:
+        save_transactions(categorized, sys.argv[3])
+        print(f"{len(categorized)} categorized transactions written to {sys.argv[3]}")
+        sys.exit(0)
+    
     # Print results
     for transaction in categorized:
         print(f"{transaction['date']} - {transaction['description']} - {transaction['amount']} -> {transaction['category']}") 
\ No newline at end of file
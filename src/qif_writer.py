@@ -13,33 +13,46 @@ def write_qif(transactions: List[Dict], output_path: str) -> None:
         # Write header
         f.write('!Type:Bank\n')
         
-        for transaction in transactions:
-            # Convert date to QIF format (MM/DD/YYYY)
-            date = datetime.strptime(transaction['date'], '%Y-%m-%d')
-            qif_date = date.strftime('%m/%d/%Y')
-            
-            # Write transaction
-            f.write(f'D{qif_date}\n')  # Date
-            f.write(f'T{transaction["amount"]}\n')  # Amount
-            f.write(f'P{transaction["description"]}\n')  # Payee/description
-            f.write(f'L{transaction["category"]}\n')  # Category
-            f.write('^\n')  # End of transaction marker
+        write_qif_records(f, transactions)
+
+def write_qif_records(f, transactions: List[Dict]) -> None:
+    """
+    Append transaction records to an open QIF file (after its header).
+    
+    Args:
+        f: Text file opened for writing
+        transactions (List[Dict]): List of transactions with date, description, amount, and category
+    """
+    for transaction in transactions:
+        # Convert date to QIF format (MM/DD/YYYY)
+        date = datetime.strptime(transaction['date'], '%Y-%m-%d')
+        qif_date = date.strftime('%m/%d/%Y')
+        
+        # Write transaction
+        f.write(f'D{qif_date}\n')  # Date
+        f.write(f'T{transaction["amount"]}\n')  # Amount
+        f.write(f'P{transaction["description"]}\n')  # Payee/description
+        f.write(f'L{transaction["category"]}\n')  # Category
+        f.write('^\n')  # End of transaction marker
 
 if __name__ == "__main__":
     import sys
-    import json
+    from columnar import is_columnar, load_transactions, read_table, write_qif_table
     
     if len(sys.argv) != 3:
-        print("Usage: python qif_writer.py <transactions_json> <output_qif>")
+        print("Usage: python qif_writer.py <transactions_json|parquet|arrow> <output_qif>")
         sys.exit(1)
     
     transactions_file = sys.argv[1]
     output_path = sys.argv[2]
     
-    # Load categorized transactions
-    with open(transactions_file, 'r', encoding='utf-8') as f:
-        transactions = json.load(f)
-    
-    # Write QIF file
-    write_qif(transactions, output_path)
+    if is_columnar(transactions_file):
+        # Columnar input is written directly from the (memory-mapped) table
+        write_qif_table(read_table(transactions_file), output_path)
+    else:
+        # Load categorized transactions
+        transactions = load_transactions(transactions_file)
+        
+        # Write QIF file
+        write_qif(transactions, output_path)
     print(f"QIF file written to {output_path}") 
\ No newline at end of file
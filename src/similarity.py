@@ -0,0 +1,130 @@
+from typing import List, Dict, FrozenSet, Iterable, Tuple
+from functools import lru_cache
+import difflib
+import random
+import time
+
+NGRAM_SIZE = 3
+
+@lru_cache(maxsize=65536)
+def ngram_profile(text: str) -> FrozenSet[str]:
+    """
+    Build the character n-gram set of a description.
+
+    The text is lowercased, whitespace is collapsed and padded with one space
+    on each side so that word boundaries also produce n-grams. Profiles are
+    cached, so a description is only decomposed once per process.
+    """
+    text = ' '.join(text.lower().split())
+    if not text:
+        return frozenset()
+    padded = f' {text} '
+    if len(padded) <= NGRAM_SIZE:
+        return frozenset([padded])
+    return frozenset(padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1))
+
+def profile_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Dice coefficient between two n-gram profiles (0 to 1, like difflib's ratio)."""
+    if not a and not b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+def description_similarity(a: str, b: str) -> float:
+    """Similarity between two descriptions (replacement for SequenceMatcher.ratio)."""
+    return profile_similarity(ngram_profile(a), ngram_profile(b))
+
+def similarity_many(text: str, profiles: List[FrozenSet[str]]) -> List[float]:
+    """
+    Compare one description against many precomputed profiles.
+
+    Args:
+        text (str): Description fixed across the whole row of comparisons
+        profiles (List[FrozenSet[str]]): Profiles built once with ngram_profile
+
+    Returns:
+        List[float]: One similarity score per profile
+    """
+    profile = ngram_profile(text)
+    return [profile_similarity(profile, other) for other in profiles]
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def calibrate(pairs: Iterable[Tuple[str, str]],
+              thresholds: Iterable[float] = (0.5, 0.6, 0.7, 0.8, 0.9)) -> Dict:
+    """
+    Compare n-gram scores with difflib ratios on the same description pairs.
+
+    Each difflib value is mapped to the n-gram score with the same rank
+    (quantile) among the pairs. The mapping is for description similarity
+    only: it is not a translation of the thresholds applied to the weighted
+    match_transactions score, which also includes date and amount.
+
+    Returns:
+        Dict: 'pairs', 'correlation', 'mapping' (difflib -> n-gram description score)
+        and 'speedup' (difflib time / n-gram time)
+    """
+    pairs = [(a.lower(), b.lower()) for a, b in pairs]
+    if not pairs:
+        return {'pairs': 0, 'correlation': 0.0, 'mapping': {}, 'speedup': 0.0}
+
+    start = time.perf_counter()
+    ratios = [difflib.SequenceMatcher(None, a, b).ratio() for a, b in pairs]
+    difflib_time = time.perf_counter() - start
+
+    ngram_profile.cache_clear()
+    start = time.perf_counter()
+    scores = [description_similarity(a, b) for a, b in pairs]
+    ngram_time = time.perf_counter() - start
+
+    n = len(pairs)
+    mean_r = sum(ratios) / n
+    mean_s = sum(scores) / n
+    cov = sum((r - mean_r) * (s - mean_s) for r, s in zip(ratios, scores))
+    var_r = sum((r - mean_r) ** 2 for r in ratios)
+    var_s = sum((s - mean_s) ** 2 for s in scores)
+    correlation = cov / (var_r * var_s) ** 0.5 if var_r and var_s else 0.0
+
+    sorted_ratios = sorted(ratios)
+    sorted_scores = sorted(scores)
+    mapping = {}
+    for threshold in thresholds:
+        rank = sum(1 for r in sorted_ratios if r < threshold) / n
+        mapping[threshold] = _quantile(sorted_scores, rank)
+
+    return {
+        'pairs': n,
+        'correlation': correlation,
+        'mapping': mapping,
+        'speedup': difflib_time / ngram_time if ngram_time else 0.0,
+    }
+
+if __name__ == "__main__":
+    import sys
+    from pdf_reader import extract_transactions as extract_from_pdf
+    from qif_parser import extract_training_data
+
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python similarity.py <pdf_file> <qif_file> [max_pairs]")
+        sys.exit(1)
+
+    pdf_descriptions = [t['description'] for t in extract_from_pdf(sys.argv[1])]
+    qif_descriptions = [t['description'] for t in extract_training_data([sys.argv[2]])]
+    max_pairs = int(sys.argv[3]) if len(sys.argv) == 4 else 100000
+
+    # Same pairs the matching loops compare, sampled if there are too many
+    all_pairs = [(a, b) for a in pdf_descriptions for b in qif_descriptions]
+    if len(all_pairs) > max_pairs:
+        all_pairs = random.Random(0).sample(all_pairs, max_pairs)
+
+    result = calibrate(all_pairs)
+    print(f"Pairs compared: {result['pairs']}")
+    print(f"Correlation with difflib: {result['correlation']:.3f}")
+    print(f"Speedup over difflib: {result['speedup']:.1f}x")
+    print("Description similarity only (not the weighted match score):")
+    print("difflib ratio -> n-gram score at the same quantile")
+    for threshold, mapped in result['mapping'].items():
+        print(f"  {threshold:.2f} -> {mapped:.3f}")
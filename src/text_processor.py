@@ -1,6 +1,15 @@
 import re
 from typing import List, Dict
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+def to_cents(amount) -> int:
+    """
+    Converte um valor (float, int ou string) para centavos inteiros,
+    sem erros de arredondamento de float.
+    """
+    value = Decimal(str(amount).replace(',', '.'))
+    return int(value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) * 100)
 
 def normalize_description(description: str) -> str:
     """
@@ -1,4 +1,5 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+import json
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline, FeatureUnion
@@ -41,52 +42,85 @@ class DateFeatureTransformer(BaseEstimator, TransformerMixin):
             features.append(' '.join(date_features))
         return features
 
+# Configuração padrão do modelo (pode ser substituída pelo resultado do tuner.py)
+DEFAULT_CONFIG = {
+    'description_ngram_range': [1, 3],
+    'description_max_features': 10000,
+    'description_min_df': 2,
+    'merchant_ngram_range': [1, 2],
+    'merchant_max_features': 5000,
+    'C': 1.0,
+    'max_iter': 1000,
+    'class_weight': 'balanced',
+}
+
+def load_config(filepath: str) -> Dict:
+    """Load a model configuration saved by tuner.py, filling missing keys with defaults."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    config = dict(DEFAULT_CONFIG)
+    config.update({k: v for k, v in saved.items() if k in DEFAULT_CONFIG})
+    return config
+
+def build_pipeline(config: Optional[Dict] = None) -> Pipeline:
+    """
+    Build the categorization pipeline for a given configuration.
+    
+    Args:
+        config (Dict): Model parameters (missing keys use DEFAULT_CONFIG)
+    """
+    params = dict(DEFAULT_CONFIG)
+    params.update(config or {})
+    
+    # Pipeline para processar descrições
+    description_pipe = Pipeline([
+        ('selector', DescriptionTransformer()),
+        ('vectorizer', TfidfVectorizer(
+            ngram_range=tuple(params['description_ngram_range']),
+            max_features=params['description_max_features'],
+            strip_accents='unicode',
+            analyzer='char_wb',
+            lowercase=True,
+            min_df=params['description_min_df']
+        ))
+    ])
+    
+    # Pipeline para processar merchants
+    merchant_pipe = Pipeline([
+        ('selector', MerchantTransformer()),
+        ('vectorizer', TfidfVectorizer(
+            ngram_range=tuple(params['merchant_ngram_range']),
+            max_features=params['merchant_max_features'],
+            strip_accents='unicode'
+        ))
+    ])
+    
+    # Pipeline para processar datas
+    date_pipe = Pipeline([
+        ('selector', DateFeatureTransformer()),
+        ('vectorizer', TfidfVectorizer(
+            ngram_range=(1, 1)
+        ))
+    ])
+    
+    # Combina todas as features
+    return Pipeline([
+        ('features', FeatureUnion([
+            ('description', description_pipe),
+            ('merchant', merchant_pipe),
+            ('date', date_pipe)
+        ])),
+        ('classifier', LogisticRegression(
+            multi_class='ovr',
+            C=params['C'],
+            max_iter=params['max_iter'],
+            class_weight=params['class_weight']
+        ))
+    ])
+
 class TransactionCategorizer:
-    def __init__(self):
-        # Pipeline para processar descrições
-        description_pipe = Pipeline([
-            ('selector', DescriptionTransformer()),
-            ('vectorizer', TfidfVectorizer(
-                ngram_range=(1, 3),
-                max_features=10000,
-                strip_accents='unicode',
-                analyzer='char_wb',
-                lowercase=True,
-                min_df=2
-            ))
-        ])
-        
-        # Pipeline para processar merchants
-        merchant_pipe = Pipeline([
-            ('selector', MerchantTransformer()),
-            ('vectorizer', TfidfVectorizer(
-                ngram_range=(1, 2),
-                max_features=5000,
-                strip_accents='unicode'
-            ))
-        ])
-        
-        # Pipeline para processar datas
-        date_pipe = Pipeline([
-            ('selector', DateFeatureTransformer()),
-            ('vectorizer', TfidfVectorizer(
-                ngram_range=(1, 1)
-            ))
-        ])
-        
-        # Combina todas as features
-        self.model = Pipeline([
-            ('features', FeatureUnion([
-                ('description', description_pipe),
-                ('merchant', merchant_pipe),
-                ('date', date_pipe)
-            ])),
-            ('classifier', LogisticRegression(
-                multi_class='ovr',
-                max_iter=1000,
-                class_weight='balanced'
-            ))
-        ])
+    def __init__(self, config: Optional[Dict] = None):
+        self.model = build_pipeline(config)
         
     def train(self, training_data: List[Dict]) -> None:
         """
@@ -124,22 +158,33 @@ class TransactionCategorizer:
         joblib.dump(self.model, filepath)
     
     @classmethod
-    def load_model(cls, filepath: str) -> 'TransactionCategorizer':
-        """Load a trained model from a file."""
+    def load_model(cls, filepath: str, mmap_mode: Optional[str] = None) -> 'TransactionCategorizer':
+        """
+        Load a trained model from a file.
+        
+        With mmap_mode='r' the model arrays are memory-mapped instead of copied,
+        so several processes loading the same file share its pages.
+        """
         categorizer = cls()
-        categorizer.model = joblib.load(filepath)
+        categorizer.model = joblib.load(filepath, mmap_mode=mmap_mode)
         return categorizer
 
 if __name__ == "__main__":
     import sys
     from qif_parser import extract_training_data
     
-    if len(sys.argv) < 3:
-        print("Usage: python trainer.py <model_output_path> <qif_file1> [qif_file2 ...]")
+    args = sys.argv[1:]
+    config = None
+    if len(args) >= 2 and args[0] == '--config':
+        config = load_config(args[1])
+        args = args[2:]
+    
+    if len(args) < 2:
+        print("Usage: python trainer.py [--config <config_json>] <model_output_path> <qif_file1> [qif_file2 ...]")
         sys.exit(1)
     
-    model_path = sys.argv[1]
-    qif_files = sys.argv[2:]
+    model_path = args[0]
+    qif_files = args[1:]
     
     # Get training data
     training_data = extract_training_data(qif_files)
@@ -149,9 +194,9 @@ if __name__ == "__main__":
         sys.exit(1)
     
     # Train model
-    categorizer = TransactionCategorizer()
+    categorizer = TransactionCategorizer(config)
     categorizer.train(training_data)
     
     # Save model
     categorizer.save_model(model_path)
-    print(f"Model saved to {model_path}") 
\ No newline at end of file
+    print(f"Model saved to {model_path}")
\ No newline at end of file
@@ -1,7 +1,7 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 from pdf_reader import extract_transactions as extract_from_pdf
 from qif_parser import extract_training_data
-import difflib
+from similarity import description_similarity, ngram_profile, similarity_many
 from datetime import datetime
 import re
 
@@ -22,15 +22,19 @@ def parse_date(date_str: str) -> datetime:
 def normalize_amount(amount_str: str) -> float:
     """Normaliza valores monetários para float"""
     # Remove símbolos de moeda e espaços
-    amount = re.sub(r'[^\d,.-]', '', amount_str)
+    # O PDF já devolve o valor como float
+    amount = re.sub(r'[^\d,.-]', '', str(amount_str))
     # Converte para formato padrão com ponto decimal
     amount = amount.replace(',', '.')
     return float(amount)
 
-def match_transactions(pdf_trans: Dict, qif_trans: Dict) -> float:
+def match_transactions(pdf_trans: Dict, qif_trans: Dict, desc_similarity: Optional[float] = None) -> float:
     """
     Calcula um score de similaridade entre duas transações.
     Retorna um valor entre 0 (completamente diferente) e 1 (match perfeito).
+    
+    desc_similarity permite passar a similaridade das descrições já calculada
+    em lote (ver similarity.similarity_many).
     """
     score = 0.0
     total_weight = 0.0
@@ -42,7 +46,8 @@ def match_transactions(pdf_trans: Dict, qif_trans: Dict) -> float:
         if pdf_date == qif_date:
             score += 3
         total_weight += 3
-    except ValueError:
+    except (KeyError, ValueError):
+        # Transações do QIF de treinamento não têm data
         pass
     
     # Compara valores (peso 3)
@@ -52,16 +57,17 @@ def match_transactions(pdf_trans: Dict, qif_trans: Dict) -> float:
         if abs(pdf_amount - qif_amount) < 0.01:  # tolerância de 1 centavo
             score += 3
         total_weight += 3
-    except ValueError:
+    except (KeyError, ValueError):
+        # Transações do QIF de treinamento não têm valor
         pass
     
     # Compara descrições (peso 2)
     if 'description' in pdf_trans and 'description' in qif_trans:
-        desc_similarity = difflib.SequenceMatcher(
-            None, 
-            pdf_trans['description'].lower(), 
-            qif_trans['description'].lower()
-        ).ratio()
+        if desc_similarity is None:
+            desc_similarity = description_similarity(
+                pdf_trans['description'],
+                qif_trans['description']
+            )
         score += 2 * desc_similarity
         total_weight += 2
     
@@ -87,16 +93,20 @@ def find_training_pairs(pdf_path: str, qif_path: str, threshold: float = 0.8) ->
     pairs = []
     used_qif = set()
     
+    # Perfis das descrições do QIF calculados uma única vez
+    qif_profiles = [ngram_profile(t.get('description', '')) for t in qif_data]
+    
     # Para cada transação do PDF, encontra o melhor match no QIF
     for pdf_trans in pdf_transactions:
         best_match = None
         best_score = threshold
+        desc_scores = similarity_many(pdf_trans.get('description', ''), qif_profiles)
         
         for i, qif_trans in enumerate(qif_data):
             if i in used_qif:
                 continue
                 
-            score = match_transactions(pdf_trans, qif_trans)
+            score = match_transactions(pdf_trans, qif_trans, desc_scores[i])
             if score > best_score:
                 best_score = score
                 best_match = (i, qif_trans)
@@ -130,9 +140,10 @@ def extract_all_training_pairs(pdf_qif_pairs: List[Tuple[str, str]], threshold:
 if __name__ == "__main__":
     import sys
     import json
+    from columnar import is_columnar, pairs_to_table, write_table
     
     if len(sys.argv) != 4:
-        print("Usage: python training_pairs.py <pdf_file> <qif_file> <output_json>")
+        print("Usage: python training_pairs.py <pdf_file> <qif_file> <output_json|output_parquet>")
         sys.exit(1)
     
     pdf_path = sys.argv[1]
@@ -142,9 +153,12 @@ if __name__ == "__main__":
     # Encontra pares de treinamento
     pairs = find_training_pairs(pdf_path, qif_path)
     
-    # Salva os pares em JSON para inspeção
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(pairs, f, indent=2, ensure_ascii=False)
+    # Salva os pares em formato colunar, ou em JSON para inspeção
+    if is_columnar(output_path):
+        write_table(pairs_to_table(pairs), output_path)
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(pairs, f, indent=2, ensure_ascii=False)
     
     print(f"Encontrados {len(pairs)} pares de treinamento")
     print(f"Resultados salvos em {output_path}") 
\ No newline at end of file
@@ -0,0 +1,219 @@
+import argparse
+import itertools
+import json
+import pickle
+import time
+from typing import List, Dict, Tuple
+
+import numpy as np
+from joblib import Parallel, delayed
+from scipy import sparse
+from sklearn.model_selection import KFold
+
+from qif_parser import extract_training_data
+from text_processor import process_transactions
+from trainer import DEFAULT_CONFIG, build_pipeline
+
+# Grade de parâmetros avaliada por padrão
+PARAM_GRID = {
+    'description_ngram_range': [[1, 3], [2, 4], [3, 3]],
+    'description_max_features': [2000, 5000, 10000],
+    'description_min_df': [1, 2],
+    'merchant_max_features': [1000, 5000],
+    'C': [0.5, 1.0, 4.0],
+}
+
+def expand_grid(grid: Dict[str, List]) -> List[Dict]:
+    """Return every configuration of the grid, filled with DEFAULT_CONFIG for the other keys."""
+    keys = list(grid)
+    configs = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        config = dict(DEFAULT_CONFIG)
+        config.update(zip(keys, values))
+        configs.append(config)
+    return configs
+
+# Parâmetros usados só pelo classificador; o resto define as features
+CLASSIFIER_KEYS = ('C', 'max_iter', 'class_weight')
+FEATURE_BLOCKS = ('description', 'merchant', 'date')
+
+def _block_key(config: Dict, block: str) -> Tuple:
+    """Parameters that determine the fitted TF-IDF of one feature block."""
+    return (block,) + tuple(
+        (k, tuple(v) if isinstance(v, list) else v)
+        for k, v in sorted(config.items()) if k.startswith(block + '_')
+    )
+
+def _fit_block(config: Dict, block: str, X: List[Dict], train_idx, test_idx):
+    """Fit one feature block (e.g. the description vectorizer) on a split."""
+    pipe = dict(build_pipeline(config).named_steps['features'].transformer_list)[block]
+    try:
+        train = pipe.fit_transform([X[i] for i in train_idx])
+    except ValueError:
+        # Ex.: min_df maior do que o número de documentos do fold
+        return None
+    test = pipe.transform([X[i] for i in test_idx]) if test_idx is not None else None
+    return pipe, train, test
+
+def _fit_classifier(config: Dict, train, y_train: np.ndarray):
+    classifier = build_pipeline(config).named_steps['classifier']
+    classifier.fit(train, y_train)
+    return classifier
+
+def _score_split(config: Dict, train, test, y_train: np.ndarray, y_test: np.ndarray) -> float:
+    classifier = _fit_classifier(config, train, y_train)
+    return float(np.mean(classifier.predict(test) == y_test))
+
+def measure_latency(model, X: List[Dict], repeats: int = 3) -> float:
+    """Return the best-of-`repeats` prediction time per transaction, in microseconds."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        best = min(best, time.perf_counter() - start)
+    return best / len(X) * 1e6
+
+def pareto_front(results: List[Dict]) -> List[Dict]:
+    """Keep the results not dominated on (accuracy, latency, model size)."""
+    front = []
+    for r in results:
+        dominated = any(
+            o['accuracy'] >= r['accuracy'] and o['latency_us'] <= r['latency_us']
+            and o['model_bytes'] <= r['model_bytes']
+            and (o['accuracy'] > r['accuracy'] or o['latency_us'] < r['latency_us']
+                 or o['model_bytes'] < r['model_bytes'])
+            for o in results
+        )
+        if not dominated:
+            front.append(r)
+    return sorted(front, key=lambda r: -r['accuracy'])
+
+def tune(training_data: List[Dict], grid: Dict[str, List], cv: int = 5,
+         n_jobs: int = -1) -> List[Dict]:
+    """
+    Cross-validate every configuration of the grid and measure its cost.
+
+    Each feature block (description, merchant, date) is fitted once per
+    distinct set of its own parameters and per fold; only the classifier is
+    fitted per configuration, on the stacked cached matrices.
+
+    Args:
+        training_data (List[Dict]): Transactions with 'description' and 'category'
+        grid (Dict[str, List]): Values to try for each DEFAULT_CONFIG key
+        cv (int): Number of cross-validation folds
+        n_jobs (int): Parallel jobs (-1 uses every core)
+
+    Returns:
+        List[Dict]: One entry per configuration with accuracy, latency_us and model_bytes
+    """
+    # O enriquecimento não depende da configuração: é feito uma única vez
+    X = process_transactions(training_data)
+    y = np.array([item['category'] for item in training_data])
+    configs = expand_grid(grid)
+    # O último split é o conjunto completo, usado para o modelo final de cada configuração
+    splits = list(KFold(n_splits=cv, shuffle=True, random_state=0).split(X))
+    splits.append((np.arange(len(X)), None))
+    parallel = Parallel(n_jobs=n_jobs)
+
+    # 1. Ajusta cada bloco de features uma única vez por (parâmetros do bloco, split)
+    block_configs = {}
+    for config in configs:
+        for block in FEATURE_BLOCKS:
+            block_configs.setdefault(_block_key(config, block), config)
+    block_tasks = [(key, s) for key in block_configs for s in range(len(splits))]
+    fitted = parallel(
+        delayed(_fit_block)(block_configs[key], key[0], X, *splits[s])
+        for key, s in block_tasks
+    )
+    blocks = dict(zip(block_tasks, fitted))
+
+    # 2. Distribui apenas a grade do classificador sobre as matrizes já calculadas
+    valid = [
+        config for config in configs
+        if all(blocks[(_block_key(config, b), s)] is not None
+               for b in FEATURE_BLOCKS for s in range(len(splits)))
+    ]
+
+    def stacked(config, s, part):
+        return sparse.hstack([blocks[(_block_key(config, b), s)][part] for b in FEATURE_BLOCKS]).tocsr()
+
+    fold_scores = parallel(
+        delayed(_score_split)(config, stacked(config, s, 1), stacked(config, s, 2),
+                              y[splits[s][0]], y[splits[s][1]])
+        for config in valid
+        for s in range(cv)
+    )
+    classifiers = parallel(
+        delayed(_fit_classifier)(config, stacked(config, cv, 1), y)
+        for config in valid
+    )
+
+    results = []
+    for i, (config, classifier) in enumerate(zip(valid, classifiers)):
+        # Monta o pipeline final com os blocos e o classificador já ajustados
+        model = build_pipeline(config)
+        model.set_params(classifier=classifier, **{
+            f'features__{b}': blocks[(_block_key(config, b), cv)][0] for b in FEATURE_BLOCKS
+        })
+        results.append({
+            'config': config,
+            'accuracy': float(np.mean(fold_scores[i * cv:(i + 1) * cv])),
+            # Latência medida sequencialmente para não sofrer com a concorrência entre jobs
+            'latency_us': measure_latency(model, X),
+            'model_bytes': len(pickle.dumps(model)),
+        })
+    return results
+
+def choose(front: List[Dict], tolerance: float) -> Dict:
+    """Pick the fastest configuration whose accuracy is within `tolerance` of the best one."""
+    best_accuracy = max(r['accuracy'] for r in front)
+    candidates = [r for r in front if r['accuracy'] >= best_accuracy - tolerance]
+    return min(candidates, key=lambda r: (r['latency_us'], r['model_bytes']))
+
+def print_report(front: List[Dict], chosen: Dict) -> None:
+    print(f"{'accuracy':>9} {'latency(us)':>12} {'size(KB)':>9}  config")
+    for r in front:
+        marker = '*' if r is chosen else ' '
+        changed = {k: v for k, v in r['config'].items() if v != DEFAULT_CONFIG.get(k)}
+        print(f"{r['accuracy']:9.4f} {r['latency_us']:12.1f} {r['model_bytes'] / 1024:9.1f} {marker} {changed or 'default'}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Search TransactionCategorizer parameters on QIF history'
+    )
+    parser.add_argument('config_output', help='Where to save the chosen configuration (JSON)')
+    parser.add_argument('qif_files', nargs='+', help='QIF files with categorized transactions')
+    parser.add_argument('--grid', help='JSON file overriding the default parameter grid')
+    parser.add_argument('--cv', type=int, default=5, help='Number of cross-validation folds')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Parallel jobs (-1 = all cores)')
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help='Accuracy that may be traded for a faster model')
+
+    args = parser.parse_args()
+
+    training_data = extract_training_data(args.qif_files)
+    if not training_data:
+        parser.error("No training data found in the provided QIF files")
+
+    grid = PARAM_GRID
+    if args.grid:
+        with open(args.grid, 'r', encoding='utf-8') as f:
+            grid = json.load(f)
+
+    results = tune(training_data, grid, cv=args.cv, n_jobs=args.n_jobs)
+    if not results:
+        parser.error("No configuration could be fitted on this data")
+
+    front = pareto_front(results)
+    chosen = choose(front, args.tolerance)
+    print_report(front, chosen)
+
+    # Salva a configuração escolhida junto com as métricas (ignoradas pelo trainer.py)
+    with open(args.config_output, 'w', encoding='utf-8') as f:
+        json.dump(dict(chosen['config'], cv_accuracy=chosen['accuracy'],
+                       latency_us=chosen['latency_us'], model_bytes=chosen['model_bytes']),
+                  f, indent=2)
+    print(f"Configuration saved to {args.config_output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+
+from pdf_reader import extract_transactions as extract_from_pdf
+from text_parser import extract_transactions_from_text
+from trainer import TransactionCategorizer
+from predictor import apply_categories
+from qif_writer import write_qif
+from dedup_index import DedupIndex
+from manifest import file_sha256
+
+SUPPORTED_EXTENSIONS = {'.pdf', '.txt'}
+
+# Delay before retrying a file that failed (doubles after each failure)
+RETRY_BACKOFF = 30.0
+MAX_RETRY_BACKOFF = 3600.0
+
+def extract_file(path: str) -> List[Dict]:
+    """
+    Extract transactions from a PDF statement or a text card dump.
+
+    Args:
+        path (str): Path to a .pdf or .txt file
+
+    Returns:
+        List[Dict]: List of transactions with date, description, and amount
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        return extract_from_pdf(path)
+    if extension == '.txt':
+        return extract_transactions_from_text(path)
+    raise ValueError(f"Unsupported file type: {path}")
+
+class StateDB:
+    """Small SQLite database recording which files were already processed."""
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS processed_files ('
+            ' sha256 TEXT PRIMARY KEY,'
+            ' path TEXT NOT NULL,'
+            ' status TEXT NOT NULL,'
+            ' output TEXT,'
+            ' transactions INTEGER,'
+            ' processed_at TEXT NOT NULL)'
+        )
+        self.conn.commit()
+
+    def is_processed(self, sha256: str) -> bool:
+        """Only successful runs count: files that failed are retried (see InboxWatcher)."""
+        row = self.conn.execute(
+            "SELECT 1 FROM processed_files WHERE sha256 = ? AND status = 'done'", (sha256,)
+        ).fetchone()
+        return row is not None
+
+    def previous_hash(self, path: str, sha256: str) -> Optional[str]:
+        """Hash of the last successfully processed version of path, if it had other content."""
+        row = self.conn.execute(
+            "SELECT sha256 FROM processed_files WHERE path = ? AND status = 'done' AND sha256 != ?"
+            " ORDER BY processed_at DESC LIMIT 1", (path, sha256)
+        ).fetchone()
+        return row[0] if row else None
+
+    def mark(self, sha256: str, path: str, status: str,
+             output: Optional[str] = None, transactions: int = 0) -> None:
+        self.conn.execute(
+            'INSERT OR REPLACE INTO processed_files VALUES (?, ?, ?, ?, ?, ?)',
+            (sha256, path, status, output, transactions, datetime.now().isoformat())
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+class InboxWatcher:
+    """
+    Watches an inbox directory and converts every new statement to QIF.
+
+    Extraction runs on a bounded process pool, while the categorization
+    model is loaded once and kept in memory for the whole daemon lifetime.
+    Files that fail (e.g. output directory full or not writable) are retried
+    with an exponential backoff, and again after a restart.
+    """
+    def __init__(self, inbox: str, output_dir: str, model_path: str, state_path: str,
+                 workers: int = 2, poll_interval: float = 1.0, dedup_path: Optional[str] = None):
+        self.inbox = inbox
+        self.output_dir = output_dir
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.categorizer = TransactionCategorizer.load_model(model_path)
+        self.state = StateDB(state_path)
+        self.dedup = DedupIndex(dedup_path) if dedup_path else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 4)
+        # Last (size, mtime) seen for files that may still be being written
+        self.pending: Dict[str, Tuple[int, float]] = {}
+        # Files already queued, so they are not hashed again on every poll
+        self.handled: Dict[str, Tuple[int, float]] = {}
+        # Failed files: (number of failures, time of the next attempt)
+        self.failures: Dict[str, Tuple[int, float]] = {}
+
+    def _scan(self) -> List[str]:
+        """Return files that are complete (unchanged since the last poll) and not handled yet."""
+        ready = []
+        seen = set()
+        for entry in os.scandir(self.inbox):
+            if not entry.is_file():
+                continue
+            if os.path.splitext(entry.name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            seen.add(entry.path)
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime)
+            if self.handled.get(entry.path) == signature:
+                continue
+            if entry.path in self.failures and time.monotonic() < self.failures[entry.path][1]:
+                continue
+            # Only queue a file once it stopped changing between two polls
+            if self.pending.get(entry.path) == signature:
+                del self.pending[entry.path]
+                self.handled[entry.path] = signature
+                ready.append(entry.path)
+            else:
+                self.pending[entry.path] = signature
+        # Forget files that left the inbox, so a long-running daemon does not grow
+        for tracked in (self.pending, self.handled, self.failures):
+            for path in [p for p in tracked if p not in seen]:
+                del tracked[path]
+        return ready
+
+    async def _poll(self) -> None:
+        while True:
+            for path in self._scan():
+                await self.queue.put(path)
+            await asyncio.sleep(self.poll_interval)
+
+    def _record_failure(self, path: str) -> None:
+        count = self.failures.get(path, (0, 0.0))[0] + 1
+        delay = min(RETRY_BACKOFF * 2 ** (count - 1), MAX_RETRY_BACKOFF)
+        self.failures[path] = (count, time.monotonic() + delay)
+        # Make the file eligible again once the backoff expires
+        self.handled.pop(path, None)
+        print(f"Retrying {path} in {delay:.0f}s (failure #{count})")
+
+    def _write_output(self, path: str, sha256: str, transactions: List[Dict]) -> str:
+        # The hash prefix keeps files with the same name from overwriting each other
+        stem = os.path.splitext(os.path.basename(path))[0]
+        output_path = os.path.join(self.output_dir, f"{stem}-{sha256[:8]}.qif")
+        tmp_path = output_path + '.tmp'
+        write_qif(transactions, tmp_path)
+        os.replace(tmp_path, output_path)
+        return output_path
+
+    async def _worker(self, executor: ProcessPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            path = await self.queue.get()
+            try:
+                try:
+                    sha256 = await asyncio.to_thread(file_sha256, path)
+                except FileNotFoundError:
+                    # Removed from the inbox after being queued
+                    continue
+                if self.state.is_processed(sha256):
+                    continue
+                try:
+                    transactions = await loop.run_in_executor(executor, extract_file, path)
+                    if self.dedup is not None:
+                        # A corrected copy dropped under the same name keeps the old rows
+                        old_sha256 = self.state.previous_hash(path, sha256)
+                        if old_sha256 is not None:
+                            self.dedup.reassign(old_sha256, sha256)
+                        transactions = self.dedup.filter(transactions, source=sha256)
+                    categorized = await asyncio.to_thread(
+                        apply_categories, transactions, self.categorizer
+                    )
+                    output_path = await asyncio.to_thread(
+                        self._write_output, path, sha256, categorized
+                    )
+                except Exception as e:
+                    print(f"Error processing {path}: {e}")
+                    self.state.mark(sha256, path, 'error')
+                    self._record_failure(path)
+                    continue
+                self.failures.pop(path, None)
+                self.state.mark(sha256, path, 'done', output_path, len(categorized))
+                print(f"{path}: {len(categorized)} transactions -> {output_path}")
+            finally:
+                self.queue.task_done()
+
+    async def run(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            tasks = [asyncio.create_task(self._worker(executor)) for _ in range(self.workers)]
+            tasks.append(asyncio.create_task(self._poll()))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                self.state.close()
+                if self.dedup is not None:
+                    self.dedup.close()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Watch an inbox directory and convert new statements to QIF'
+    )
+    parser.add_argument('inbox', help='Directory where PDF/text statements are dropped')
+    parser.add_argument('output_dir', help='Directory for the per-file QIF output')
+    parser.add_argument('--model', required=True, help='Trained model (see trainer.py)')
+    parser.add_argument('--state', default=None,
+                        help='SQLite state DB (default: <output_dir>/.watcher_state.db)')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='Number of files extracted concurrently')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds between inbox scans')
+    parser.add_argument('--dedup-index',
+                        help='SQLite index used to drop transactions repeated across overlapping statements')
+
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    state_path = args.state or os.path.join(args.output_dir, '.watcher_state.db')
+    watcher = InboxWatcher(args.inbox, args.output_dir, args.model, state_path,
+                           workers=args.workers, poll_interval=args.poll_interval,
+                           dedup_path=args.dedup_index)
+    print(f"Watching {args.inbox} (Ctrl+C to stop)")
+    try:
+        asyncio.run(watcher.run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dedup_index import DedupIndex
+
+
+def rows(*items):
+    return [{'date': d, 'description': desc, 'amount': amount} for d, desc, amount in items]
+
+
+def test_overlap_between_statements_is_dropped(tmp_path):
+    index = DedupIndex(str(tmp_path / 'dedup.db'))
+    jan = rows(('2024-01-30', 'CAFE X 123', -3.5), ('2024-01-30', 'CAFE X 456', -3.5))
+    feb = rows(('2024-01-30', 'cafe x', '-3,50'), ('2024-02-01', 'BP', -40))
+
+    assert index.filter(jan, source='jan') == jan
+    assert index.filter(feb, source='feb') == feb[1:]
+    # Reprocessing the same statement keeps its own rows
+    assert index.filter(jan, source='jan') == jan
+
+
+def test_replaced_statement_keeps_its_rows(tmp_path):
+    index = DedupIndex(str(tmp_path / 'dedup.db'))
+    a = rows(('2024-01-30', 'LIDL', -7))
+    b_old = rows(('2024-01-31', 'UBER', -10), ('2024-02-01', 'BP', -40))
+    b_new = rows(('2024-01-31', 'UBER', -12), ('2024-02-01', 'BP', -40))
+    index.filter(a, source='a')
+    index.filter(b_old, source='b-v1')
+
+    index.reassign('b-v1', 'b-v2')
+
+    assert index.filter(b_new, source='b-v2') == b_new
+    # The corrected UBER amount released the old claim, so it no longer blocks others
+    assert index.filter(rows(('2024-01-31', 'UBER', -10)), source='c') == rows(('2024-01-31', 'UBER', -10))